@@ -1,31 +1,72 @@
-import pandas as pd
-from bs4 import BeautifulSoup
-import requests
-from datetime import datetime
+from selectolax.lexbor import LexborHTMLParser
+import httpx
+import asyncio
+import atexit
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+import io
+import logging
 import os
-from flask import Flask, request, jsonify
-import traceback # For better error logging
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from flask import Flask
+import orjson
+from cachetools import TTLCache
 
 app = Flask(__name__) 
 
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+log = logging.getLogger(__name__)
+# httpx logs every request at INFO; keep those per-fetch lines out of the default output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("httpcore").setLevel(logging.WARNING)
+
 # --- Flask Root Route for Health Checks/Debugging ---
 @app.route('/')
 def hello_root():
-    print("DEBUG: Root / endpoint hit!")
+    log.debug("Root / endpoint hit!")
     return "Hello, root is working!", 200
 
 # --- Constants ---
-WEEKDAY_TIMES = ["07:00 PM", "08:00 PM", "09:00 PM", "10:00 PM"]
-WEEKEND_TIMES = ["11:00 AM", "12:00 PM", "01:00 PM", "02:00 PM", "03:00 PM", "04:00 PM", "05:00 PM", "06:00 PM", "07:00 PM", "08:00 PM", "09:00 PM", "10:00 PM"]
+# All bookable start times, in display order
+TIME_SLOTS = ("11:00 AM", "12:00 PM", "01:00 PM", "02:00 PM", "03:00 PM", "04:00 PM", "05:00 PM", "06:00 PM", "07:00 PM", "08:00 PM", "09:00 PM", "10:00 PM")
+
+# Membership sets (checked once per parsed slot, so frozensets for O(1) lookups)
+WEEKDAY_TIMES = frozenset(["07:00 PM", "08:00 PM", "09:00 PM", "10:00 PM"])
+WEEKEND_TIMES = frozenset(TIME_SLOTS)
+
+# Each start time maps to one bit, in display order. A court's availability for a day is the OR
+# of its times' bits, so unions are integer ORs and sorting is just walking the bits.
+TIME_BIT = {t: 1 << i for i, t in enumerate(TIME_SLOTS)}
 
-# Consolidated Court definitions
-EXPO_COURTS = ['A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9', 'A10', 'B11', 'B12', 'B13', 'B14', 'B15', 'B16', 'B17', 'B18', 'B19', 'B20', 'B21', 'B22']
-EXPO_COURTS_A = ['A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9', 'A10']
-EXPO_COURTS_B = ['B11', 'B12', 'B13', 'B14', 'B15', 'B16', 'B17', 'B18', 'B19', 'B20', 'B21', 'B22']
+def _times_mask(times):
+    mask = 0
+    for t in times:
+        mask |= TIME_BIT[t]
+    return mask
+
+@lru_cache(maxsize=None) # Bounded by the 2 ** len(TIME_SLOTS) possible masks
+def _mask_label(mask):
+    """
+    Renders a start-time mask as its display string, e.g. "07:00 PM | 09:00 PM".
+    """
+    return " | ".join(t for i, t in enumerate(TIME_SLOTS) if mask >> i & 1)
 
-SIMS_COURTS = ["P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8", "D1", "D2", "D3", "D4", "D5", "D6", "D7", "D8"]
-SIMS_COURTS_P = ["P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8"]
-SIMS_COURTS_D = ["D1", "D2", "D3", "D4", "D5", "D6", "D7", "D8"]
+# Consolidated Court definitions, in display order (so A2 is listed before A10)
+EXPO_COURTS_A = ('A1', 'A2', 'A3', 'A4', 'A5', 'A6', 'A7', 'A8', 'A9', 'A10')
+EXPO_COURTS_B = ('B11', 'B12', 'B13', 'B14', 'B15', 'B16', 'B17', 'B18', 'B19', 'B20', 'B21', 'B22')
+EXPO_COURTS_ORDER = EXPO_COURTS_A + EXPO_COURTS_B
+
+SIMS_COURTS_P = ("P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8")
+SIMS_COURTS_D = ("D1", "D2", "D3", "D4", "D5", "D6", "D7", "D8")
+SIMS_COURTS_ORDER = SIMS_COURTS_D + SIMS_COURTS_P # Weekday listing keeps D before P
+
+# Membership sets for the parser
+EXPO_COURTS = frozenset(EXPO_COURTS_ORDER)
+SIMS_COURTS = frozenset(SIMS_COURTS_ORDER)
 
 FACILITY_IDS = {
     "expo": "2967",
@@ -37,247 +78,510 @@ LOCATION_COURTS_ALL = {
     "sims": SIMS_COURTS
 }
 
-def fetch_available_slots(date_str, location, allowed_times):
+# Report sections per day type, in output order: (location, title, court_groups, grouped).
+# Weekdays list each location's courts flat; weekends break Expo into A/B and Sims into P/D.
+WEEKDAY_SECTIONS = (
+    ("expo", "Expo", ((EXPO_COURTS_ORDER, "🩵"),), False),
+    ("sims", "Sims", ((SIMS_COURTS_ORDER, "💙"),), False),
+)
+WEEKEND_SECTIONS = (
+    ("expo", "Expo", ((EXPO_COURTS_A, "🟠"), (EXPO_COURTS_B, "🔵")), True),
+    ("sims", "Sims", ((SIMS_COURTS_P, "🟡"), (SIMS_COURTS_D, "🟤")), True),
+)
+
+# --- Upstream HTTP ---
+SLOTS_URL = "https://singaporebadmintonhall.getomnify.com/welcome/loadSlotsByTagId"
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36",
+    "Accept-Encoding": "br, gzip", # httpx decodes br via the brotli package
+}
+REQUEST_TIMEOUT_SECONDS = 15
+REQUEST_CONNECT_TIMEOUT_SECONDS = 3 # Fail fast on an unreachable host instead of waiting out the full timeout
+FETCH_ATTEMPTS = 3
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_BACKOFF_CAP_SECONDS = 30
+RETRY_JITTER_SECONDS = 0.5
+# Hard cap on one page's fetch, retries and backoff included, so a report is answered before the
+# Apps Script caller's ~60s UrlFetch deadline. Nothing server-side bounds a request: gunicorn's
+# gthread --timeout only watches worker heartbeats, and Cloud Run's request timeout is far longer.
+FETCH_BUDGET_SECONDS = 40
+SLOT_SELECTOR = 'div.time-slot.facility-slot'
+# Opening <div> tags mentioning time-slot, and the double-quoted attributes inside one
+SLOT_TAG_RE = re.compile(rb'<div\b[^>]*\btime-slot\b[^>]*>', re.IGNORECASE)
+TAG_ATTR_RE = re.compile(rb'([\w:-]+)\s*=\s*"([^"]*)"')
+# Byte-string twins of the lookups above, so the regex scanner can filter before decoding
+LOCATION_COURTS_BYTES = {location: frozenset(c.encode() for c in courts) for location, courts in LOCATION_COURTS_ALL.items()}
+TIME_BIT_BYTES = {t.encode(): bit for t, bit in TIME_BIT.items()}
+
+# One long-lived event loop on a background thread owns the HTTP client, so its keep-alive
+# connections survive from one report to the next instead of closing after every asyncio.run.
+_fetch_loop = None
+_fetch_loop_lock = threading.Lock()
+_fetch_client = None
+
+# Page parsing is CPU work under the GIL, so a few reusable threads are plenty to keep it off
+# the fetch loop; more would only contend for the interpreter.
+PARSE_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="parse")
+atexit.register(PARSE_EXECUTOR.shutdown, wait=False)
+
+# --- Slot Cache ---
+# Parsed availability per (location, date_str), shared by weekday and weekend callers.
+# The TTL matches REPORT_FRESH_SECONDS, so a report rebuilt after going stale sees fresh pages.
+SLOT_CACHE_TTL_SECONDS = 60
+_slot_cache = TTLCache(maxsize=64, ttl=SLOT_CACHE_TTL_SECONDS)
+_slot_cache_lock = threading.Lock()
+# (location, date_str) -> asyncio task fetching that page; only touched on the fetch loop thread
+_slot_fetches = {}
+
+def _get_cached_courts(key):
+    with _slot_cache_lock:
+        return _slot_cache.get(key)
+
+def _set_cached_courts(key, court_list):
+    with _slot_cache_lock:
+        _slot_cache[key] = court_list
+
+def _filter_courts_by_mask(court_list, allowed_mask):
+    filtered = {}
+    for court, mask in court_list.items():
+        mask &= allowed_mask
+        if mask:
+            filtered[court] = mask
+    return filtered
+
+async def _get_with_retries(client, params):
+    """
+    GETs the slots page, retrying transport errors and RETRY_STATUSES with capped exponential
+    backoff plus jitter, or after the server's Retry-After (in seconds, also capped) when it
+    sends one. Any other HTTP error status (e.g. 4xx) raises immediately.
+    """
+    for attempt in range(1, FETCH_ATTEMPTS + 1):
+        try:
+            response = await client.get(SLOTS_URL, params=params)
+            response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in RETRY_STATUSES or attempt == FETCH_ATTEMPTS:
+                raise
+            retry_after = e.response.headers.get("Retry-After")
+        except httpx.TransportError:
+            if attempt == FETCH_ATTEMPTS:
+                raise
+            retry_after = None
+        try:
+            delay = min(RETRY_BACKOFF_CAP_SECONDS, max(0.0, float(retry_after)))
+        except (TypeError, ValueError): # No header, or an HTTP-date rather than seconds
+            delay = min(RETRY_BACKOFF_CAP_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            delay += random.uniform(0, RETRY_JITTER_SECONDS)
+        await asyncio.sleep(delay)
+
+async def fetch_available_slots(client, date_str, location, allowed_times):
     """
     Fetches available slots for a given date, location, and list of times.
-    Returns (date_str, location, allowed_times, court_list) for consistency.
+    Returns (date_str, location, allowed_times, court_list) for consistency, where court_list
+    maps each court to a bitmask of its available start times (see TIME_BIT), or is None if
+    the page could not be fetched.
+    Parsed pages are cached for SLOT_CACHE_TTL_SECONDS, keyed by (location, date_str), and
+    concurrent callers for the same key share one in-flight fetch.
     """
-    url = "https://singaporebadmintonhall.getomnify.com/welcome/loadSlotsByTagId"
-    
-    if location not in FACILITY_IDS:
-        print(f"ERROR: Unknown location: {location}")
+    facility_id = FACILITY_IDS.get(location)
+    if facility_id is None:
+        log.error("Unknown location: %s", location)
         return date_str, location, allowed_times, {}
-
+    allowed_mask = _times_mask(allowed_times)
+
+    cache_key = (location, date_str)
+    cached = _get_cached_courts(cache_key)
+    if cached is not None:
+        return date_str, location, allowed_times, _filter_courts_by_mask(cached, allowed_mask)
+
+    pending = _slot_fetches.get(cache_key)
+    if pending is None:
+        pending = _slot_fetches[cache_key] = asyncio.ensure_future(_fetch_courts(client, date_str, location, facility_id))
+        pending.add_done_callback(lambda _: _slot_fetches.pop(cache_key, None))
+    # Shielded so one caller being cancelled does not cancel the fetch for the others
+    court_list = await asyncio.shield(pending)
+    if court_list is None:
+        return date_str, location, allowed_times, None
+    return date_str, location, allowed_times, _filter_courts_by_mask(court_list, allowed_mask)
+
+async def _fetch_courts(client, date_str, location, facility_id):
+    """
+    Fetches and parses one slots page into {court: start_time_mask} and caches it.
+    Returns None, uncached, if the page could not be fetched.
+    """
     params = {
         "date": date_str,
-        "facilitytag_id": FACILITY_IDS[location],
+        "facilitytag_id": facility_id,
         "timezone": "Asia/Singapore"
     }
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/100.0.4896.127 Safari/537.36"}
-    
+
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=15)
-        response.raise_for_status() 
-    except requests.exceptions.RequestException as e:
-        print(f"ERROR: Error fetching data for {location} on {date_str}: {e}")
-        return date_str, location, allowed_times, {}
+        response = await asyncio.wait_for(_get_with_retries(client, params), FETCH_BUDGET_SECONDS)
+    except httpx.HTTPError as e:
+        log.error("Error fetching data for %s on %s: %s", location, date_str, e)
+        return None
+    except asyncio.TimeoutError:
+        log.error("Gave up fetching %s on %s after %ds", location, date_str, FETCH_BUDGET_SECONDS)
+        return None
+
+    # Parse on a worker thread so the event loop keeps reading the other responses meanwhile
+    loop = asyncio.get_running_loop()
+    court_list = await loop.run_in_executor(PARSE_EXECUTOR, _parse_courts, response.content, location)
+
+    _set_cached_courts((location, date_str), court_list)
+    return court_list
+
+def _parse_courts(body, location):
+    """
+    Parses a slots page into {court: start_time_mask} for every available slot at location.
+    Uses the regex scanner, falling back to the full HTML parser if the markup defeats it.
+    """
+    court_list = _parse_courts_regex(body, location)
+    if court_list is None:
+        log.warning("Regex slot parse could not read the slot markup for %s, falling back to HTML parser", location)
+        court_list = _parse_courts_html(body, location)
+    return court_list
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    slots = soup.select('div.time-slot.facility-slot')
+def _parse_courts_regex(body, location):
+    """
+    Scans the raw response bytes for slot <div> tags and reads their attributes directly,
+    without building a DOM. Attribute order within the tag does not matter, and values are
+    compared as bytes so only accepted court names are ever decoded.
+    Returns None if slot tags were found but none could be read, or if any facility-slot tag
+    has markup the scanner cannot read reliably (single-quoted or missing attributes, a '>'
+    inside a value, character references), so the caller can fall back. A page without slot
+    tags (even one whose CSS mentions time-slot) has no slots.
+    """
+    location_courts = LOCATION_COURTS_BYTES[location]
+    court_list = {}
+    found_tag = False
+    found_slot = False
+
+    # Skip the page chrome before the first slot: jump straight to its opening <div>
+    first_slot = body.find(b"time-slot")
+    if first_slot == -1:
+        return court_list
+    start = max(body.rfind(b"<div", 0, first_slot), 0)
+
+    for match in SLOT_TAG_RE.finditer(body, start):
+        found_tag = True
+        # Read the attributes in place rather than slicing a copy of the tag out of body
+        attrs = {name.lower(): value for name, value in TAG_ATTR_RE.findall(body, match.start(), match.end())}
+        classes = attrs.get(b"class")
+        court = attrs.get(b"data-facility_name")
+        start_time = attrs.get(b"data-starttime")
+        if classes is None or court is None or start_time is None or b"&" in court or b"&" in start_time:
+            # Any facility slot we cannot read in full means the markup has drifted
+            if body.find(b"facility-slot", match.start(), match.end()) != -1:
+                return None
+            continue
+        classes = classes.split()
+        if b"time-slot" not in classes or b"facility-slot" not in classes:
+            continue
+        found_slot = True
+        if court not in location_courts:
+            continue
+        time_bit = TIME_BIT_BYTES.get(start_time)
+        if time_bit is None: # Not a time any report shows
+            continue
+        if attrs.get(b"data-isblocked") == b"1":
+            continue
+        if b"blockedslot" in classes:
+            continue
+        court = court.decode()
+        court_list[court] = court_list.get(court, 0) | time_bit
+
+    return court_list if found_slot or not found_tag else None
+
+def _parse_courts_html(body, location):
+    """
+    DOM-based parse of the raw response bytes; the parser decodes them natively.
+    """
+    tree = LexborHTMLParser(body)
+    slots = tree.css(SLOT_SELECTOR)
 
+    location_courts = LOCATION_COURTS_ALL[location]
     court_list = {}
+    # Cheapest checks first, so filtered-out slots bail before the class attribute is read
     for slot in slots:
-        court = slot.get("data-facility_name")
-        time = slot.get("data-starttime")
-        is_blocked = slot.get("data-isBlocked") == "1"
-        blocked_class = "blockedslot" in slot.get("class", [])
-        is_available = not (is_blocked or blocked_class)
+        # .attrs reads each attribute straight from the Lexbor node on demand, instead of
+        # building a dict of all of them like .attributes does
+        attrs = slot.attrs
+        court = attrs.get("data-facility_name")
+        if court not in location_courts:
+            continue
+        time_bit = TIME_BIT.get(attrs.get("data-starttime"))
+        if time_bit is None: # Not a time any report shows
+            continue
+        # The parser lower-cases attribute names, so data-isBlocked arrives as data-isblocked.
+        if attrs.get("data-isblocked") == "1":
+            continue
+        if "blockedslot" in (attrs.get("class") or ""): # Unique token, so a substring test suffices
+            continue
+        court_list[court] = court_list.get(court, 0) | time_bit
+
+    return court_list
+
+def _get_fetch_client():
+    """
+    Returns the process-wide HTTP client, creating it on first use.
+    The client speaks HTTP/2, so fetches multiplex over a single TLS connection when the
+    server supports it, and it carries the default headers and timeout. Redirects are
+    followed, as requests.get did before it.
+    Only called on the fetch loop thread, so no locking is needed.
+    """
+    global _fetch_client
+    if _fetch_client is None:
+        # Enough connections for every fetch of a report at once if the server only speaks HTTP/1.1
+        limits = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+        timeout = httpx.Timeout(REQUEST_TIMEOUT_SECONDS, connect=REQUEST_CONNECT_TIMEOUT_SECONDS)
+        _fetch_client = httpx.AsyncClient(
+            http2=True, headers=REQUEST_HEADERS, timeout=timeout, limits=limits, follow_redirects=True)
+    return _fetch_client
+
+async def _fetch_section(client, dates, allowed_times, location, title, court_groups, grouped):
+    """
+    Fetches one location for every date in dates, then formats its report block.
+    Returns (block, failed): the block as a string, ready to be written into the report, and
+    whether any of its fetches failed (those dates are reported as having no timeslots).
+    """
+    coros = [fetch_available_slots(client, date_str, location, allowed_times) for date_str in dates]
+    results = await asyncio.gather(*coros, return_exceptions=True)
+
+    data_dict = {}
+    failed = False
+    for date_str, result in zip(dates, results):
+        if isinstance(result, Exception):
+            log.error("Unexpected error fetching %s on %s", location, date_str, exc_info=result)
+            courts_data = None
+        else:
+            _, _, _, courts_data = result
+        if courts_data is None:
+            failed = True
+            courts_data = {}
+        data_dict[date_str] = courts_data
+
+    buf = io.StringIO()
+    _format_section(buf.write, title, data_dict, court_groups, grouped)
+    return buf.getvalue(), failed
+
+async def fetch_report_sections(weekdays_dates, weekends_dates):
+    """
+    Fetches and formats all four report sections concurrently over the shared client.
+    Each section is formatted as soon as its own fetches finish, overlapping with the fetches
+    still in flight for the others. Returns the (block, failed) pairs from _fetch_section in
+    WEEKDAY_SECTIONS + WEEKEND_SECTIONS order.
+    """
+    client = _get_fetch_client()
+    coros = [_fetch_section(client, weekdays_dates, WEEKDAY_TIMES, *section) for section in WEEKDAY_SECTIONS]
+    coros += [_fetch_section(client, weekends_dates, WEEKEND_TIMES, *section) for section in WEEKEND_SECTIONS]
+    return await asyncio.gather(*coros)
 
-        if court in LOCATION_COURTS_ALL[location] and time in allowed_times and is_available:
-            court_list.setdefault(court, []).append(time)
-            
-    return date_str, location, allowed_times, court_list
+def _run_on_fetch_loop(coro):
+    """
+    Runs coro on the long-lived fetch loop and blocks the calling thread until it finishes.
+    The loop (and its thread) is started lazily, so gunicorn's --preload fork never copies it.
+    """
+    global _fetch_loop
+    with _fetch_loop_lock:
+        if _fetch_loop is None:
+            _fetch_loop = asyncio.new_event_loop()
+            threading.Thread(target=_fetch_loop.run_forever, name="fetch-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _fetch_loop).result()
+
+@lru_cache(maxsize=1)
+def _report_window(today_ordinal):
+    """
+    Splits the 7 days after the given day (a date ordinal) into (weekdays_dates, weekends_dates)
+    tuples of YYYY-MM-DD strings. Cached, so it is only recomputed when the day changes.
+    """
+    today = date.fromordinal(today_ordinal)
+    weekdays_dates = []
+    weekends_dates = []
+
+    for i in range(1, 8):
+        the_date = today + timedelta(days=i)
+        date_str = the_date.strftime('%Y-%m-%d')
+        if the_date.weekday() >= 5:
+            weekends_dates.append(date_str)
+        else:
+            weekdays_dates.append(date_str)
+    return tuple(weekdays_dates), tuple(weekends_dates)
+
+@lru_cache(maxsize=64)
+def _format_date(date_str):
+    """
+    Formats a YYYY-MM-DD string for display, e.g. "17 Oct (Sat)". Cached for the process
+    lifetime, so each date is parsed once even across /execute calls on the same day.
+    """
+    return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d %b (%a)")
 
-def generate_report():
+def _format_section(w, title, data_dict, court_groups, grouped):
+    """
+    Writes one location's block of the report through w, the report buffer's write method.
+    court_groups is a sequence of (courts, marker) pairs, with courts in display order; when
+    grouped is True each non-empty group is set off by a divider line and indented one level further.
     """
-    Main function to generate the availability report, with detailed court breakdown.
-    Now uses sequential fetching without ThreadPoolExecutor.
+    w("\n🏟️🏟️ "); w(title); w(" 🏟️🏟️\n")
+    # Non-breaking spaces keep the indentation from being collapsed by chat clients
+    indent = "\u00a0 \u00a0 " if grouped else "\u00a0 "
+    for date_str in sorted(data_dict.keys()):
+        courts_data = data_dict[date_str]
+        formatted_date = _format_date(date_str)
+
+        # Clearing the lowest set bit leaves zero exactly when at most one time is set. Only
+        # none / one / several matters here, so stop as soon as a second time shows up.
+        unique_mask = 0
+        for mask in courts_data.values():
+            unique_mask |= mask
+            if unique_mask & (unique_mask - 1):
+                break
+
+        if unique_mask & (unique_mask - 1): # More than one unique time
+            w("\n📅 "); w(formatted_date); w("\n")
+            # Walk each group's fixed court order rather than sorting the day's court names
+            for courts, marker in court_groups:
+                group_courts = [court for court in courts if court in courts_data]
+                if not group_courts:
+                    continue
+                if grouped:
+                    w("  --------------------\n")
+                for court in group_courts:
+                    mask = courts_data[court]
+                    if mask: # Only print court if it has times
+                        w(indent); w(marker); w(" "); w(court); w(" - "); w(_mask_label(mask)); w("\n")
+        elif unique_mask: # Exactly one unique time
+            w("\n❌ "); w(formatted_date); w(": Insufficient slots for proper booking\n")
+        else: # No unique times (len == 0)
+            w("\n❌ "); w(formatted_date); w(": No timeslots found.\n")
+
+def _build_report():
     """
+    Fetches every date/location and formats the availability report, with detailed court breakdown.
+    All upstream fetches run concurrently via asyncio.gather. Exceptions propagate to the caller.
+    Returns (result, complete), where complete is False if any upstream fetch failed.
+    """
+    log.debug("Building report (concurrent fetching).")
+    weekdays_dates, weekends_dates = _report_window(date.today().toordinal())
+
+    # --- Concurrent Fetching (all days and locations at once, each section formatted on arrival) ---
+    log.debug("Fetching %d date/location combinations concurrently...", 2 * (len(weekdays_dates) + len(weekends_dates)))
+    sections = _run_on_fetch_loop(fetch_report_sections(weekdays_dates, weekends_dates))
+    expo_weekday, sims_weekday, expo_weekend, sims_weekend = (block for block, _ in sections)
+    complete = not any(failed for _, failed in sections)
+
+    # --- Format Output Message ---
+    buf = io.StringIO()
+    w = buf.write
+
+    w("🏸 Badminton Court Availability (Next 7 Days) 🏸\n\n\n\n")
+
+    # --- Weekday Report ---
+    w("━━━━━━━━━━━━━━━\n")
+    w("    WEEKDAYS    \n")  # 4 spaces each side
+    w("  (7 PM – 10 PM) \n")
+    w("━━━━━━━━━━━━━━━\n")
+
+    w(expo_weekday)
+    w(sims_weekday)
+
+    # --- Weekend Report ---
+    w(f"\n{'='*15}\n")
+    w("━━━━━━━━━━━━━━━\n")
+    w("    WEEKENDS    \n")  # 4 spaces each side
+    w("  (11 AM – 10 PM) \n")
+    w("━━━━━━━━━━━━━━━\n")
+
+    # Expo with A/B breakdown, Sims with P/D breakdown
+    w(expo_weekend)
+    w(sims_weekend)
+
+    final_message = buf.getvalue()[:-1] # Every line ends in a newline; the message does not
+
+    log.debug("Report built successfully.")
+    return {
+        "message": final_message,
+        "image": None # No chart is rendered; the key is kept for the Apps Script client
+    }, complete
+
+def _error_report(e):
+    log.exception("Unhandled exception while building the report")
+    return {
+        "message": f"An unexpected error occurred: {str(e)}\n\nPlease check the logs in Cloud Run.",
+        "image": None
+    }
+
+# --- Report Cache ---
+# The whole report is a function of today's date and recent availability, so bursts of
+# /execute calls (e.g. Apps Script retries) can share one result. Reports with failed fetches
+# are served to their caller but never stored, so an upstream outage is not replayed from cache.
+REPORT_FRESH_SECONDS = 60
+REPORT_STALE_SECONDS = 300
+_report_cache = {}
+_report_cache_lock = threading.Lock()
+_report_refreshing = set()
+_report_building = {} # key -> Future for a cold build in progress, shared by concurrent misses
+
+def _refresh_report_in_background(key):
     try:
-        print("DEBUG: Starting generate_report function (sequential fetching).")
-        today = datetime.today().date()
-        weekdays_dates = []
-        weekends_dates = []
-
-        for i in range(1, 8):
-            the_date = today + pd.Timedelta(days=i)
-            date_str = the_date.strftime('%Y-%m-%d')
-            if the_date.weekday() >= 5:
-                weekends_dates.append(date_str)
-            else:
-                weekdays_dates.append(date_str)
-
-        all_fetched_data = {
-            "expo_weekday": {},
-            "sims_weekday": {},
-            "expo_weekend": {},
-            "sims_weekend": {}
-        }
-
-        # --- Sequential Fetching (ThreadPoolExecutor removed) ---
-        # Fetch weekday data
-        for day_str in weekdays_dates:
-            print(f"DEBUG: Fetching weekday data for {day_str} (Expo)...")
-            _, _, _, courts_data = fetch_available_slots(day_str, "expo", WEEKDAY_TIMES)
-            all_fetched_data["expo_weekday"][day_str] = courts_data
-
-            print(f"DEBUG: Fetching weekday data for {day_str} (Sims)...")
-            _, _, _, courts_data = fetch_available_slots(day_str, "sims", WEEKDAY_TIMES)
-            all_fetched_data["sims_weekday"][day_str] = courts_data
-        
-        # Fetch weekend data
-        for day_str in weekends_dates:
-            print(f"DEBUG: Fetching weekend data for {day_str} (Expo)...")
-            _, _, _, courts_data = fetch_available_slots(day_str, "expo", WEEKEND_TIMES)
-            all_fetched_data["expo_weekend"][day_str] = courts_data
-
-            print(f"DEBUG: Fetching weekend data for {day_str} (Sims)...")
-            _, _, _, courts_data = fetch_available_slots(day_str, "sims", WEEKEND_TIMES)
-            all_fetched_data["sims_weekend"][day_str] = courts_data
-
-
-        # --- Format Output Message ---
-        output_parts = []
-
-        output_parts.append("🏸 Badminton Court Availability (Next 7 Days) 🏸\n\n\n")
-        
-        # --- Weekday Report ---
-        output_parts.append("━━━━━━━━━━━━━━━")
-        output_parts.append("    WEEKDAYS    ")  # 4 spaces each side
-        output_parts.append("  (7 PM – 10 PM) ")
-        output_parts.append("━━━━━━━━━━━━━━━")
-
-
-        
-        # Expo Courts for Weekdays
-        output_parts.append("\n🏟️🏟️ Expo 🏟️🏟️") 
-        for date_str in sorted(all_fetched_data["expo_weekday"].keys()):
-            courts_data = all_fetched_data["expo_weekday"][date_str]
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%d %b (%a)") 
-            
-            unique_times = set()
-            for times in courts_data.values():
-                unique_times.update(times)
-            
-            if len(unique_times) > 1: # More than one unique time
-                output_parts.append(f"\n📅 {formatted_date}") 
-                for court in sorted(courts_data.keys()):
-                    times_for_court = sorted(courts_data[court], key=lambda t: datetime.strptime(t, "%I:%M %p"))
-                    if times_for_court: # Only print court if it has times
-                        output_parts.append(f"  🩵 {court} - {' | '.join(times_for_court)}") # Added orange circle
-            elif len(unique_times) == 1: # Exactly one unique time
-                output_parts.append(f"\n❌ {formatted_date}: Insufficient slots for proper booking")
-            else: # No unique times (len == 0)
-                output_parts.append(f"\n❌ {formatted_date}: No timeslots found.")
-        
-        # Sims Courts for Weekdays
-        output_parts.append("\n🏟️🏟️ Sims 🏟️🏟️") 
-        for date_str in sorted(all_fetched_data["sims_weekday"].keys()):
-            courts_data = all_fetched_data["sims_weekday"][date_str]
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%d %b (%a)")
-            
-            unique_times = set()
-            for times in courts_data.values():
-                unique_times.update(times)
-            
-            if len(unique_times) > 1: # More than one unique time
-                output_parts.append(f"\n📅 {formatted_date}") 
-                for court in sorted(courts_data.keys()):
-                    times_for_court = sorted(courts_data[court], key=lambda t: datetime.strptime(t, "%I:%M %p"))
-                    if times_for_court: # Only print court if it has times
-                        output_parts.append(f"  💙 {court} - {' | '.join(times_for_court)}") # Added orange circle
-            elif len(unique_times) == 1: # Exactly one unique time
-                output_parts.append(f"\n❌ {formatted_date}: Insufficient slots for proper booking")
-            else: # No unique times (len == 0)
-                output_parts.append(f"\n❌ {formatted_date}: No timeslots found.")
-
-
-        # --- Weekend Report ---
-        output_parts.append(f"\n{'='*15}")
-        output_parts.append("━━━━━━━━━━━━━━━")
-        output_parts.append("    WEEKENDS    ")  # 4 spaces each side
-        output_parts.append("  (11 AM – 10 PM) ")
-        output_parts.append("━━━━━━━━━━━━━━━")
-
-
-        # Expo Courts for Weekends (with A/B breakdown)
-        output_parts.append("\n🏟️🏟️ Expo 🏟️🏟️") 
-        for date_str in sorted(all_fetched_data["expo_weekend"].keys()):
-            courts_data = all_fetched_data["expo_weekend"][date_str]
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%d %b (%a)")
-            
-            unique_times_all = set()
-            for times in courts_data.values():
-                unique_times_all.update(times)
-            
-            if len(unique_times_all) > 1: # More than one unique time
-                output_parts.append(f"\n📅 {formatted_date}") 
-                
-                court_a_data = {k: v for k, v in courts_data.items() if k in EXPO_COURTS_A}
-                court_b_data = {k: v for k, v in courts_data.items() if k in EXPO_COURTS_B}
-
-                if court_a_data:
-                    output_parts.append("  --------------------") 
-                    for court in sorted(court_a_data.keys()):
-                        times = sorted(court_a_data[court], key=lambda t: datetime.strptime(t, "%I:%M %p"))
-                        if times:
-                            output_parts.append(f"    🟠 {court} - {' | '.join(times)}") # Added orange circle
-                
-                if court_b_data:
-                    output_parts.append("  --------------------") 
-                    for court in sorted(court_b_data.keys()):
-                        times = sorted(court_b_data[court], key=lambda t: datetime.strptime(t, "%I:%M %p"))
-                        if times:
-                            output_parts.append(f"    🔵 {court} - {' | '.join(times)}") # Added orange circle
-            elif len(unique_times_all) == 1: # Exactly one unique time
-                output_parts.append(f"\n❌ {formatted_date}: Insufficient slots for proper booking")
-            else: # No unique times (len == 0)
-                output_parts.append(f"\n❌ {formatted_date}: No timeslots found.")
-        
-        # Sims Courts for Weekends (with P/D breakdown)
-        output_parts.append("\n🏟️🏟️ Sims 🏟️🏟️") 
-        for date_str in sorted(all_fetched_data["sims_weekend"].keys()):
-            courts_data = all_fetched_data["sims_weekend"][date_str]
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%d %b (%a)")
-            
-            unique_times_all = set()
-            for times in courts_data.values():
-                unique_times_all.update(times)
-            
-            if len(unique_times_all) > 1: # More than one unique time
-                output_parts.append(f"\n📅 {formatted_date}") 
-                
-                court_p_data = {k: v for k, v in courts_data.items() if k in SIMS_COURTS_P}
-                court_d_data = {k: v for k, v in courts_data.items() if k in SIMS_COURTS_D}
-
-                if court_p_data:
-                    output_parts.append("  --------------------") 
-                    for court in sorted(court_p_data.keys()):
-                        times = sorted(court_p_data[court], key=lambda t: datetime.strptime(t, "%I:%M %p"))
-                        if times:
-                            output_parts.append(f"    🟡 {court} - {' | '.join(times)}") # Added orange circle
-                
-                if court_d_data:
-                    output_parts.append("  --------------------") 
-                    for court in sorted(court_d_data.keys()):
-                        times = sorted(court_d_data[court], key=lambda t: datetime.strptime(t, "%I:%M %p"))
-                        if times:
-                            output_parts.append(f"    🟤 {court} - {' | '.join(times)}") # Added orange circle
-            elif len(unique_times_all) == 1: # Exactly one unique time
-                output_parts.append(f"\n❌ {formatted_date}: Insufficient slots for proper booking")
-            else: # No unique times (len == 0)
-                output_parts.append(f"\n❌ {formatted_date}: No timeslots found.")
-
-        final_message = "\n".join(output_parts)
-        
-        img_base64 = None 
-
-        print("DEBUG: generate_report completed successfully.")
-        return {
-            "message": final_message,
-            "image": img_base64 
-        }
+        result, complete = _build_report()
+    except Exception:
+        log.exception("Background report refresh failed")
+    else:
+        if complete:
+            with _report_cache_lock:
+                _report_cache[key] = (time.monotonic(), result)
+        else:
+            log.warning("Background report refresh had failed fetches; keeping the cached report")
+    finally:
+        with _report_cache_lock:
+            _report_refreshing.discard(key)
+
+def get_report():
+    """
+    Returns (result, cache_status) for today's report, where cache_status is HIT, STALE or MISS.
+    Entries younger than REPORT_FRESH_SECONDS are served as-is; entries up to REPORT_STALE_SECONDS
+    old are served immediately while a background thread rebuilds them (stale-while-revalidate).
+    Concurrent misses share a single build: the first caller builds, the rest wait for its result.
+    """
+    key = date.today().isoformat() # Same clock as _build_report's date window
+    with _report_cache_lock:
+        entry = _report_cache.get(key)
+        if entry is not None:
+            stored_at, result = entry
+            age = time.monotonic() - stored_at
+            if age <= REPORT_FRESH_SECONDS:
+                return result, "HIT"
+            if age <= REPORT_STALE_SECONDS:
+                if key not in _report_refreshing:
+                    _report_refreshing.add(key)
+                    threading.Thread(target=_refresh_report_in_background, args=(key,), daemon=True).start()
+                return result, "STALE"
+        building = _report_building.get(key)
+        if building is None:
+            building = _report_building[key] = Future()
+            is_builder = True
+        else:
+            is_builder = False
+
+    if not is_builder:
+        return building.result(), "MISS"
 
+    try:
+        result, complete = _build_report()
     except Exception as e:
-        print(f"ERROR: Unhandled exception in generate_report: {traceback.format_exc()}") 
-        return {
-            "message": f"An unexpected error occurred: {str(e)}\n\nPlease check the logs in Cloud Run.",
-            "image": None
-        }
+        result, complete = _error_report(e), False
+
+    with _report_cache_lock:
+        del _report_building[key]
+        if complete:
+            # Only today's report is ever served, so older days can be dropped.
+            _report_cache.clear()
+            _report_cache[key] = (time.monotonic(), result)
+    building.set_result(result)
+    return result, "MISS"
 
 # --- Flask Endpoint ---
 @app.route('/execute', methods=['POST'])
@@ -285,12 +589,15 @@ def handle_execute():
     """
     API endpoint that receives requests from Google Apps Script.
     """
-    print("DEBUG: /execute endpoint hit.")
-    result = generate_report()
-    print(f"DEBUG: Returning result from /execute: {result.get('message')[:100]}...")
-    return jsonify(result)
+    log.debug("/execute endpoint hit.")
+    result, cache_status = get_report()
+    log.debug("Returning result from /execute (%s)", cache_status)
+    response = app.response_class(orjson.dumps(result), mimetype='application/json')
+    response.headers["X-Cache"] = cache_status
+    return response
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
-    print(f"DEBUG: Flask app starting on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=True)
+    log.info("Flask app starting on port %d", port)
+    # Local development only; production runs under gunicorn (see Procfile)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,58 @@
+import unittest
+
+import main
+
+
+def _page(*slots):
+    return ("<html><body><div class=\"slots\">" + "".join(slots) + "</div></body></html>").encode()
+
+
+SLOT = '<div class="time-slot facility-slot" data-facility_name="{court}" data-starttime="{time}" data-isBlocked="0"></div>'
+
+# Slot markup the regex scanner reads directly
+PLAIN_PAGES = {
+    "plain": _page(
+        SLOT.format(court="A1", time="07:00 PM"),
+        SLOT.format(court="A10", time="08:00 PM"),
+        SLOT.format(court="B11", time="07:00 PM"),
+        '<div class="time-slot facility-slot blockedslot" data-facility_name="A2" data-starttime="07:00 PM"></div>',
+        '<div class="time-slot facility-slot" data-facility_name="A3" data-starttime="07:00 PM" data-isBlocked="1"></div>',
+    ),
+    "no slots": _page(),
+    "css mentions time-slot": b"<html><head><style>.time-slot{color:red}</style></head><body><div>none</div></body></html>",
+}
+
+# Slot markup the regex scanner cannot read, so it must defer to the DOM parser
+DRIFTED_PAGES = {
+    "gt in attribute value": _page(
+        '<div class="time-slot facility-slot" title="a > b" data-facility_name="A1" data-starttime="07:00 PM"></div>',
+        SLOT.format(court="A2", time="07:00 PM"),
+    ),
+    "single-quoted attributes": _page(
+        "<div class='time-slot facility-slot' data-facility_name='A1' data-starttime='07:00 PM'></div>",
+        SLOT.format(court="A2", time="07:00 PM"),
+    ),
+    "character reference": _page(
+        '<div class="time-slot facility-slot" data-facility_name="A1" data-starttime="07:00&#32;PM"></div>',
+        SLOT.format(court="A2", time="07:00 PM"),
+    ),
+}
+
+
+class ParseParityTest(unittest.TestCase):
+    def test_regex_matches_dom(self):
+        for name, body in PLAIN_PAGES.items():
+            with self.subTest(name):
+                self.assertEqual(main._parse_courts_regex(body, "expo"), main._parse_courts_html(body, "expo"))
+
+    def test_drifted_markup_falls_back_to_dom(self):
+        for name, body in DRIFTED_PAGES.items():
+            with self.subTest(name):
+                self.assertIsNone(main._parse_courts_regex(body, "expo"))
+                expected = main._parse_courts_html(body, "expo")
+                self.assertIn("A1", expected)
+                self.assertEqual(main._parse_courts(body, "expo"), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()